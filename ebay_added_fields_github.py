@@ -1,24 +1,46 @@
 import streamlit as st
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import re
 import datetime
-import pytz
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from base64 import b64encode
-import warnings
 
 # Initialize session state
 if 'saved_searches' not in st.session_state:
     st.session_state.saved_searches = []
+if 'saved_search_names' not in st.session_state:
+    st.session_state.saved_search_names = {s['name'] for s in st.session_state.saved_searches}
+if 'saved_search_editor_version' not in st.session_state:
+    st.session_state.saved_search_editor_version = 0
 
 # eBay API credentials
 CLIENT_ID = st.secrets["ebay"]["CLIENT_ID"]
 CLIENT_SECRET = st.secrets["ebay"]["CLIENT_SECRET"]
 
-credentials = b64encode(f"{CLIENT_ID}:{CLIENT_SECRET}".encode()).decode()
+@st.cache_resource
+def get_http_session():
+    # One pooled keep-alive session per server process, reused across reruns and users
+    session = requests.Session()
+    retries = Retry(
+        total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"], raise_on_status=False
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
+    session.headers.update({"Accept-Encoding": "gzip", "Accept": "application/json"})
+    return session
 
-@st.cache_data(ttl=3600)
+# eBay tokens live 7200s; refresh well before expiry
+@st.cache_resource(ttl=3300)
 def get_access_token():
     token_url = "https://api.ebay.com/identity/v1/oauth2/token"
+    credentials = b64encode(f"{CLIENT_ID}:{CLIENT_SECRET}".encode()).decode()
     headers = {
         "Content-Type": "application/x-www-form-urlencoded",
         "Authorization": f"Basic {credentials}"
@@ -27,99 +49,317 @@ def get_access_token():
         "grant_type": "client_credentials",
         "scope": "https://api.ebay.com/oauth/api_scope"
     }
-    response = requests.post(token_url, headers=headers, data=data)
-    return response.json().get("access_token")
+    response = get_http_session().post(token_url, headers=headers, data=data, timeout=(5, 10))
+    # Raise rather than return so a failed token request is retried next run instead of cached
+    response.raise_for_status()
+    return orjson.loads(response.content).get("access_token")
+
+@st.cache_resource(max_entries=1)
+def get_api_headers(access_token):
+    # Built once per token and shared by every Browse API call; only the current token is kept
+    return {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
 
-access_token = get_access_token()
+try:
+    access_token = get_access_token()
+except requests.RequestException:
+    access_token = None
 
 # ============================================================
 # HELPERS
 # ============================================================
 
-def categorize_seller(feedback_score, feedback_percent):
-    try:
-        score = int(feedback_score) if feedback_score is not None else 0
-        percent = float(feedback_percent) if feedback_percent is not None else 0
-    except (ValueError, TypeError):
-        return "Uncategorized"
-    if score >= 5000 and percent >= 99:
-        return "Elite"
-    elif score >= 1000 and percent >= 98:
-        return "Excellent"
-    elif score >= 500 and percent >= 97:
-        return "Very Good"
-    elif score >= 100 and percent >= 95:
-        return "Good"
-    elif score >= 100 and percent >= 90:
-        return "Average"
-    elif score < 100 and percent >= 90:
-        return "Inexperienced"
-    elif percent < 90:
-        return "Low Rated"
-    else:
-        return "Uncategorized"
-
-def is_charity_seller(seller_username):
-    if not seller_username:
-        return False
-    seller_lower = seller_username.lower()
-    charity_keywords = [
-        "goodwill","shopsastores","salvationarmy","salvation_army","habitat",
-        "habitatrestore","habitatforhumanity","faith_resale_online","vaporthriftonline",
-        "nonprofit","svdp","stvincentdepaul","vincentdepaul","catholiccharities",
-        "catholiccharity","oxfam","barnardos","britishheartfoundation","bhf",
-        "redcross","charity","charities","thriftstoreusa","charitythrift","nonprofitstore"
+SELLER_RATINGS = ["Elite", "Excellent", "Very Good", "Good", "Average", "Inexperienced", "Low Rated"]
+
+def categorize_sellers(feedback_scores, feedback_percents):
+    """Seller rating tier per row; unparseable feedback values are "Uncategorized"."""
+    score_num = pd.to_numeric(feedback_scores, errors="coerce")
+    percent_num = pd.to_numeric(feedback_percents, errors="coerce")
+    invalid = ((score_num.isna() & feedback_scores.notna()) | (percent_num.isna() & feedback_percents.notna())).to_numpy()
+    score = score_num.fillna(0).to_numpy()
+    percent = percent_num.fillna(0).to_numpy()
+    conditions = [
+        invalid,
+        (score >= 5000) & (percent >= 99),
+        (score >= 1000) & (percent >= 98),
+        (score >= 500) & (percent >= 97),
+        (score >= 100) & (percent >= 95),
+        (score >= 100) & (percent >= 90),
+        (score < 100) & (percent >= 90),
+        percent < 90
     ]
-    return any(keyword in seller_lower for keyword in charity_keywords)
+    return np.select(conditions, ["Uncategorized"] + SELLER_RATINGS, default="Uncategorized")
+
+CHARITY_KEYWORDS = [
+    "goodwill","shopsastores","salvationarmy","salvation_army","habitat",
+    "habitatrestore","habitatforhumanity","faith_resale_online","vaporthriftonline",
+    "nonprofit","svdp","stvincentdepaul","vincentdepaul","catholiccharities",
+    "catholiccharity","oxfam","barnardos","britishheartfoundation","bhf",
+    "redcross","charity","charities","thriftstoreusa","charitythrift","nonprofitstore"
+]
+
+CHARITY_PATTERN = "|".join(CHARITY_KEYWORDS)
+
+# Browse API item fields used by the search tab, mapped from json_normalize paths to column names
+ITEM_COLUMNS = {
+    "title": "listing",
+    "condition": "condition",
+    "price.value": "price",
+    "shippingOptions": "shipping_options",
+    "buyingOptions": "buying_options",
+    "itemEndDate": "end_date",
+    "currentBidPrice.value": "current_bid_price",
+    "bidCount": "bid_count",
+    "itemWebUrl": "link",
+    "seller.username": "seller",
+    "seller.feedbackScore": "seller_feedback_score",
+    "seller.feedbackPercentage": "seller_feedback"
+}
+
+SEARCH_RESULT_SCHEMA = pa.schema([
+    ("listing", pa.string()),
+    ("condition", pa.string()),
+    ("price", pa.float64()),
+    ("current_bid_price", pa.float64()),
+    ("listing_type", pa.string()),
+    ("bid_count", pa.int64()),
+    ("auction_end_time", pa.string()),
+    ("seller", pa.string()),
+    ("seller_rating", pa.string()),
+    ("seller_feedback", pa.float64()),
+    ("seller_feedback_score", pa.int64()),
+    ("link", pa.string())
+])
+
+def build_search_results(items, max_price, seller_type_filter="All", seller_rating_filter=None, excluded_pattern=None):
+    """Flatten Browse API itemSummaries into the search results table, column-wise."""
+    if not items:
+        return SEARCH_RESULT_SCHEMA.empty_table().to_pandas(types_mapper=pd.ArrowDtype)
+    # Every field we read sits at most one level deep, so deeper objects are left unflattened
+    raw = pd.json_normalize(items, max_level=1).reindex(columns=list(ITEM_COLUMNS)).rename(columns=ITEM_COLUMNS)
+
+    price = pd.to_numeric(raw["price"], errors="coerce").fillna(0.0)
+    shipping = pd.to_numeric(
+        raw["shipping_options"].astype(object).str[0].str.get("shippingCost").str.get("value"),
+        errors="coerce"
+    ).fillna(0.0)
+    seller_username = raw["seller"].fillna("")
+
+    # Drop over-budget and non-charity rows first so the remaining columns are only derived for kept rows
+    keep = (price + shipping) <= max_price
+    if seller_type_filter == "Charity":
+        keep &= seller_username.str.lower().str.contains(CHARITY_PATTERN, regex=True)
+    if excluded_pattern is not None:
+        keep &= ~raw["listing"].fillna("").str.contains(excluded_pattern)
+    raw, price, seller_username = raw[keep], price[keep], seller_username[keep]
+
+    listing_type = raw["buying_options"].astype(object).str.join(", ").fillna("")
+    is_auction = listing_type.str.contains("AUCTION", regex=False)
+    seller_feedback_score = pd.to_numeric(raw["seller_feedback_score"], errors="coerce").fillna(0).astype(int)
+    seller_feedback_percent = pd.to_numeric(raw["seller_feedback"], errors="coerce").fillna(0.0)
+
+    end_time_str = raw["end_date"]
+    end_time_local = (
+        pd.to_datetime(end_time_str, utc=True, errors="coerce", format="ISO8601")
+        .dt.tz_convert("US/Central")
+        .dt.strftime("%Y-%m-%d %I:%M %p %Z")
+    )
+    auction_end_time = pd.Series(
+        np.where(is_auction & end_time_str.notna(), end_time_local.fillna("Invalid date"), "N/A"),
+        index=raw.index
+    )
+
+    df = pd.DataFrame({
+        "listing": raw["listing"].fillna(""),
+        "condition": raw["condition"],
+        "price": price,
+        "current_bid_price": pd.to_numeric(raw["current_bid_price"], errors="coerce").fillna(0.0).where(is_auction),
+        "listing_type": listing_type,
+        "bid_count": raw["bid_count"].where(is_auction),
+        "auction_end_time": auction_end_time,
+        "seller": seller_username,
+        "seller_rating": categorize_sellers(raw["seller_feedback_score"], raw["seller_feedback"]),
+        "seller_feedback": seller_feedback_percent,
+        "seller_feedback_score": seller_feedback_score,
+        "link": raw["link"]
+    }, index=raw.index)
+
+    if seller_rating_filter:
+        df = df[df["seller_rating"].isin(seller_rating_filter)]
+    # Arrow-backed columns are already typed and hand off to st.dataframe without conversion
+    table = pa.Table.from_pandas(df, schema=SEARCH_RESULT_SCHEMA, preserve_index=False)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+BROWSE_SEARCH_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+BROWSE_PAGE_SIZE = 200  # Browse API maximum; any limit up to this is a single request
+BROWSE_MAX_WORKERS = 8  # matches pool_maxsize in get_http_session
+MAX_SEARCH_LIMIT = 1000
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_ebay_items(query, filter_str, limit, category_id, access_token):
+    """Raw Browse API itemSummaries, cached per query so repeat searches don't re-hit eBay."""
+    params = {"filter": filter_str}
+    if query:
+        params["q"] = query
+    if category_id:
+        params["category_ids"] = category_id
+    headers = get_api_headers(access_token)
+    session = get_http_session()
+
+    def fetch_page(offset, page_limit=BROWSE_PAGE_SIZE):
+        page_params = {**params, "offset": offset, "limit": page_limit}
+        response = session.get(BROWSE_SEARCH_URL, params=page_params, headers=headers, timeout=30)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    # The first page tells us how many matches exist, so no calls are spent on empty pages
+    first_page = fetch_page(0, min(limit, BROWSE_PAGE_SIZE))
+    items = first_page.get("itemSummaries", [])
+    # Later pages always ask for the full page size because eBay rejects offsets that aren't a multiple of limit
+    offsets = range(BROWSE_PAGE_SIZE, min(limit, first_page.get("total", 0)), BROWSE_PAGE_SIZE)
+    if offsets:
+        # Network-bound, so threads overlap the round-trips
+        with ThreadPoolExecutor(max_workers=BROWSE_MAX_WORKERS) as executor:
+            for page in executor.map(fetch_page, offsets):
+                items.extend(page.get("itemSummaries", []))
+    return items[:limit]
+
+@st.cache_data(ttl=600, show_spinner=False)
+def run_search(search_term, selected_category, listing_type_filter, seller_type_filter,
+               seller_rating_filter, max_price, limit, access_token):
+    """Query build, fetch and post-processing in one cache entry keyed on every search input."""
+    search_term = search_term.strip()
+    if selected_category in ACCESSORY_EXCLUSION_CATEGORIES:
+        query = f'"{search_term}"' if search_term else ""
+        excluded_terms = ACCESSORY_EXCLUDED_TERMS
+    else:
+        query = search_term
+        excluded_terms = EXCLUDED_TERMS
+    # Negative keywords only narrow a real search term and never exclude words the user asked for
+    excluded_terms = active_exclusion_terms(excluded_terms, search_term) if search_term else ()
+    excluded_pattern = None
+    if excluded_terms:
+        query += " -(" + ",".join(excluded_terms) + ")"
+        # Mirror exactly the terms sent as whole-word title matches, to drop anything eBay's keyword matching lets through
+        excluded_pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, excluded_terms)) + r")\b", re.IGNORECASE)
+
+    filters = [f"price:[1..{max_price}]", *SEARCH_BASE_FILTERS]
+    if listing_type_filter in LISTING_TYPE_FILTERS:
+        filters.append(LISTING_TYPE_FILTERS[listing_type_filter])
+
+    if selected_category in aspect_map:
+        aspect_name, aspect_value = aspect_map[selected_category]
+        filters.append(f"aspect_filter={aspect_name}:{{{aspect_value}}}")
+        if selected_category == "Men's Clothing":
+            query += ' "Medium"'
+        elif selected_category == "Men's Shoes":
+            query += ' "11"'
+
+    items = fetch_ebay_items(query.strip(), ",".join(filters), limit, category_options[selected_category], access_token)
+    return build_search_results(items, max_price, seller_type_filter, seller_rating_filter, excluded_pattern)
 
 def save_current_search(search_params):
     search_name = f"{search_params['search_term']} in {search_params['category']} (${search_params['max_price']})"
-    existing_names = [s['name'] for s in st.session_state.saved_searches]
-    if search_name not in existing_names:
-        st.session_state.saved_searches.append({
-            'name': search_name,
-            'params': search_params,
-            'saved_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-        })
-        return True
-    return False
+    if search_name in st.session_state.saved_search_names:
+        return False
+    st.session_state.saved_search_names.add(search_name)
+    st.session_state.saved_searches.append({
+        'name': search_name,
+        'params': search_params,
+        'saved_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    })
+    return True
 
 def load_saved_search(search_params):
-    for key, value in search_params.items():
-        st.session_state[f"loaded_{key}"] = value
+    st.session_state['loaded'] = dict(search_params)
 
 def delete_saved_search(index):
     if 0 <= index < len(st.session_state.saved_searches):
-        del st.session_state.saved_searches[index]
+        removed = st.session_state.saved_searches.pop(index)
+        st.session_state.saved_search_names.discard(removed['name'])
+
+@st.cache_data(ttl=600, show_spinner=False)
+def to_csv_bytes(df):
+    # Serialized once per distinct frame; download-button reruns reuse the bytes
+    return df.to_csv(index=False, lineterminator="\n").encode("utf-8")
 
 def create_price_analytics(df):
     if df.empty:
         return
+    # Mean and median in a single aggregation over the already typed price column
+    stats = df['price'].agg(['mean', 'median'])
+    avg_price = stats['mean']
+    deals = df[df['price'] < (avg_price * 0.85)]
     col1, col2, col3, _ = st.columns(4)
-    avg_price = df['price'].mean()
     with col1:
         st.metric("Average Price", f"${avg_price:.2f}")
     with col2:
-        st.metric("Median Price", f"${df['price'].median():.2f}")
+        st.metric("Median Price", f"${stats['median']:.2f}")
     with col3:
-        deal_count = len(df[df['price'] < (avg_price * 0.85)])
-        st.metric("Potential Deals", f"{deal_count} item(s)", help="Items priced 15% below average")
+        st.metric("Potential Deals", f"{len(deals)} item(s)", help="Items priced 15% below average")
     st.subheader("🎯 Best Deals (15% below average)")
-    deals = df[df['price'] < (avg_price * 0.85)]
     if not deals.empty:
-        deals_display = deals.copy()
-        deals_display['savings'] = deals_display['price'].apply(lambda p: f"${avg_price - p:.2f}")
+        deals_display = deals.assign(savings=avg_price - deals['price'])
         st.dataframe(
             deals_display[['listing', 'condition', 'price', 'savings', 'seller', 'seller_rating', 'seller_feedback', 'link']],
             column_config={
                 "link": st.column_config.LinkColumn("Link", display_text="View Deal"),
-                "price": st.column_config.NumberColumn("price", format="$%.2f")
+                "price": st.column_config.NumberColumn("price", format="$%.2f"),
+                "savings": st.column_config.NumberColumn("savings", format="$%.2f")
             },
-            use_container_width=True
+            hide_index=True,
+            width="stretch"
         )
     else:
         st.info("No significant deals found in current results.")
 
+SEARCH_COLUMN_CONFIG = {
+    "price": st.column_config.NumberColumn("price", format="$%.2f"),
+    "current_bid_price": st.column_config.NumberColumn("current_bid_price", format="$%.2f"),
+    "link": st.column_config.LinkColumn("Link", display_text="View Listing")
+}
+RESULTS_PAGE_SIZE = 20
+
+def show_results_page(df):
+    # Only the selected page is serialized to the browser
+    page_count = (len(df) - 1) // RESULTS_PAGE_SIZE + 1
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+    start = (page - 1) * RESULTS_PAGE_SIZE
+    st.dataframe(
+        df.iloc[start:start + RESULTS_PAGE_SIZE],
+        column_config=SEARCH_COLUMN_CONFIG,
+        hide_index=True,
+        width="stretch"
+    )
+
+@st.fragment
+def render_search_results(results, listing_type_filter, seller_type_filter):
+    if not results.empty and listing_type_filter != "Auction":
+        df = results.sort_values(by="price").reset_index(drop=True)
+        df = df.drop(columns=['current_bid_price', 'bid_count', 'auction_end_time'], errors='ignore')
+        st.header("📊 Price Analytics")
+        create_price_analytics(df)
+        st.header("📋 Search Results")
+        if seller_type_filter == "Charity":
+            st.info(f"🏪 Showing {len(df)} listings from charity stores")
+        show_results_page(df)
+        st.download_button("📥 Download Results as CSV", to_csv_bytes(df),
+            f"ebay_search_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.csv", "text/csv")
+        st.success(f"Found {len(results)} listings" + (" from charity stores" if seller_type_filter == "Charity" else ""))
+
+    elif not results.empty and listing_type_filter == "Auction":
+        st.header("📋 Auction Listings")
+        df = results.drop(columns=['price'], errors='ignore')
+        df = df.sort_values(by="auction_end_time", ascending=True, na_position="last").reset_index(drop=True)
+        if seller_type_filter == "Charity":
+            st.info(f"🏪 Showing {len(df)} auction listings from charity stores")
+        show_results_page(df)
+        st.download_button("📥 Download Results as CSV", to_csv_bytes(df),
+            f"ebay_search_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.csv", "text/csv")
+        st.success(f"Found {len(results)} auction listings" + (" from charity stores" if seller_type_filter == "Charity" else ""))
+    else:
+        st.info("No listings found from charity stores matching your criteria." if seller_type_filter == "Charity"
+                else "No listings found matching your criteria.")
+
 # ============================================================
 # CATEGORY & ASPECT MAPS
 # ============================================================
@@ -144,11 +384,50 @@ category_options = {
     "Video Games & Consoles": "1249",
     "Vinyl Records": "176985"
 }
+CATEGORY_NAMES = tuple(category_options)
+CATEGORY_INDEX = {name: i for i, name in enumerate(CATEGORY_NAMES)}
 
 aspect_map = {
     "Men's Shoes": ("US Shoe Size", "11")
 }
 
+# Negative keywords appended to search queries
+ACCESSORY_EXCLUSION_CATEGORIES = frozenset({"Cell Phones & Smartphones", "Tablets & eBook Readers"})
+ACCESSORY_EXCLUDED_TERMS = (
+    "case", "cover", "keyboard", "manual", "guide", "screen", "protector", "folio", "box", "accessory",
+    "cable", "cord", "charger", "pen", "for parts", "not working", "empty box"
+)
+EXCLUDED_TERMS = ("broken", "defective", "not working", "for parts", "empty box")
+
+def active_exclusion_terms(excluded_terms, search_term):
+    """Excluded terms minus any the search term itself contains, e.g. "broken" for "Broken Sword"."""
+    return tuple(
+        term for term in excluded_terms
+        if not re.search(rf"\b{re.escape(term)}\b", search_term, re.IGNORECASE)
+    )
+
+# Server-side condition filter — excludes "for parts" (7000) listings
+SEARCH_CONDITION_IDS = "1000|1500|2000|2500|3000"
+
+# Static parts of the Browse API filter string
+SEARCH_BASE_FILTERS = ("priceCurrency:USD", f"conditionIds:{{{SEARCH_CONDITION_IDS}}}")
+LISTING_TYPE_FILTERS = {
+    "Auction": "buyingOptions:{AUCTION}",
+    "Fixed Price": "buyingOptions:{FIXED_PRICE}",
+    "Best Offer": "buyingOptions:{BEST_OFFER}"
+}
+
+# Widget option lists, built once rather than on every rerun
+LISTING_TYPE_OPTIONS = ("All", *LISTING_TYPE_FILTERS)
+SELLER_TYPE_OPTIONS = ("All", "Charity")
+CONDITION_MAP = {
+    "Used only": "3000",
+    "New only": "1000",
+    "New + Used": "1000|1500|3000",
+    "All conditions": "1000|1500|2000|2500|3000"
+}
+CONDITION_LABELS = tuple(CONDITION_MAP)
+
 # ============================================================
 # LOT ANALYSIS — Fee constants & functions
 # ============================================================
@@ -157,6 +436,8 @@ aspect_map = {
 # Everything else (incl. video games & vinyl): 13.6% FVF
 # All categories: +2% promoted listings
 MEDIA_CATEGORIES_153 = {"Books", "DVD & Blu-ray", "Music CDs", "Music Cassettes", "Manga"}
+MEDIA_FVF_RATE = 0.153
+DEFAULT_FVF_RATE = 0.136
 PROMOTED_LISTINGS_FEE = 0.02
 TAX_RATE = 0.0825
 PER_TRANSACTION_FEE = 0.40
@@ -170,123 +451,123 @@ SHIPPING_MEDIA_MAIL = 4.39
 
 SHIPPING_STANDARD = 6.50
 
-def get_shipping_cost(category):
-    if category in VIDEO_GAME_CATEGORIES:
-        return SHIPPING_VIDEO_GAMES
-    elif category in MEDIA_MAIL_CATEGORIES:
-        return SHIPPING_MEDIA_MAIL
-    else:
-        return SHIPPING_STANDARD
+# FVF + promoted listings, precomputed per category; unknown categories use the default rate
+COMBINED_FEE_RATES = {category: MEDIA_FVF_RATE + PROMOTED_LISTINGS_FEE for category in MEDIA_CATEGORIES_153}
+DEFAULT_COMBINED_FEE_RATE = DEFAULT_FVF_RATE + PROMOTED_LISTINGS_FEE
 
-def get_combined_fee_rate(category):
-    fvf = 0.153 if category in MEDIA_CATEGORIES_153 else 0.136
-    return fvf + PROMOTED_LISTINGS_FEE
+# Shipping per category; video games take precedence over media mail, everything else ships standard
+SHIPPING_COSTS = {
+    **{category: SHIPPING_MEDIA_MAIL for category in MEDIA_MAIL_CATEGORIES},
+    **{category: SHIPPING_VIDEO_GAMES for category in VIDEO_GAME_CATEGORIES}
+}
 
-def calculate_profit(sale_price, acquisition_cost, margin_target, category="All Categories"):
-    combined_fee_rate = get_combined_fee_rate(category)
-    shipping = get_shipping_cost(category)
+def calculate_total_fees(sale_price, combined_fee_rate, shipping):
+    # Plain arithmetic so it works on scalars and NumPy arrays alike
     tax_gross_up = sale_price * TAX_RATE
     fee_basis = sale_price + shipping + tax_gross_up
-    total_fees = (fee_basis * combined_fee_rate) + PER_TRANSACTION_FEE + PACKAGING_COST
-    total_payout = sale_price - total_fees
-    net_profit = sale_price - total_fees - acquisition_cost
-    margin = (net_profit / sale_price) * 100 if sale_price > 0 else 0
-    return {
-        "net_profit": round(net_profit, 2),
-        "margin_pct": round(margin, 1),
-        "total_fees": round(total_fees, 2),
-        "total_payout": round(total_payout, 2),
+    return (fee_basis * combined_fee_rate) + PER_TRANSACTION_FEE + PACKAGING_COST
+
+def get_fee_arrays(categories):
+    """Per-row combined fee rate and shipping cost for a category column."""
+    categories = pd.Series(categories)
+    combined_fee_rate = categories.map(COMBINED_FEE_RATES).fillna(DEFAULT_COMBINED_FEE_RATE).to_numpy(dtype=float)
+    shipping = categories.map(SHIPPING_COSTS).fillna(SHIPPING_STANDARD).to_numpy(dtype=float)
+    return combined_fee_rate, shipping
+
+def calculate_profit_columns(sale_prices, acquisition_costs, margin_target, categories):
+    """Net profit, margin, fees, payout and max acquisition per title, computed over whole columns."""
+    categories = pd.Series(categories)
+    sale_prices = pd.Series(sale_prices, index=categories.index).to_numpy(dtype=float)
+    acquisition_costs = np.asarray(acquisition_costs, dtype=float)
+    total_fees = calculate_total_fees(sale_prices, *get_fee_arrays(categories))
+    net_profit = sale_prices - total_fees - acquisition_costs
+    margin = np.divide(net_profit * 100, sale_prices, out=np.zeros_like(net_profit), where=sale_prices > 0)
+    return pd.DataFrame({
+        "net_profit": net_profit.round(2),
+        "margin_pct": margin.round(1),
+        "total_fees": total_fees.round(2),
+        "total_payout": (sale_prices - total_fees).round(2),
+        # Most you can pay per title and still hit margin_target
+        "max_acquisition": (sale_prices * (1 - margin_target / 100) - total_fees).round(2),
         "meets_target": margin >= margin_target
-    }
-
-def calculate_max_acquisition(sale_price, margin_target, category="All Categories"):
-    combined_fee_rate = get_combined_fee_rate(category)
-    shipping = get_shipping_cost(category)
-    tax_gross_up = sale_price * TAX_RATE
-    fee_basis = sale_price + shipping + tax_gross_up
-    total_fees = (fee_basis * combined_fee_rate) + PER_TRANSACTION_FEE + PACKAGING_COST
-    max_acq = sale_price * (1 - margin_target / 100) - total_fees
-    return round(max_acq, 2)
+    }, index=categories.index)
 
 def get_equilibrium_price(title, category_id, bulk_max_price, bulk_limit, access_token, condition_ids="1000|1500|2000|2500|3000"):
-    params = {
-        "q": title,
-        "filter": ",".join([
-            f"price:[1..{bulk_max_price}]",
-            "priceCurrency:USD",
-            f"conditions:{{{condition_ids}}}"
-        ]),
-        "limit": bulk_limit
-    }
-    if category_id:
-        params["category_ids"] = category_id
-    headers_api = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    filter_str = ",".join([
+        f"price:[1..{bulk_max_price}]",
+        "priceCurrency:USD",
+        f"conditionIds:{{{condition_ids}}}"
+    ])
     try:
-        resp = requests.get(
-            "https://api.ebay.com/buy/browse/v1/item_summary/search",
-            params=params, headers=headers_api
-        )
-        prices = []
-        items_with_prices = []
-        if resp.status_code == 200:
-            for item in resp.json().get("itemSummaries", []):
-                if item.get("conditionId") in ("7000", "1000"):
-                    continue
-                price = float(item.get("price", {}).get("value", 0.0))
-                if 1 <= price <= bulk_max_price:
-                    prices.append(price)
-                    items_with_prices.append((price, item.get("itemWebUrl", "")))
-        if not prices:
+        items = fetch_ebay_items(title, filter_str, bulk_limit, category_id, access_token)
+        if not items:
+            return 0.0, 0, []
+        comps = pd.json_normalize(items, max_level=1).reindex(columns=["conditionId", "price.value", "itemWebUrl"])
+        comps["price"] = pd.to_numeric(comps["price.value"], errors="coerce").fillna(0.0)
+        comps = comps[~comps["conditionId"].isin(["7000", "1000"]) & comps["price"].between(1, bulk_max_price)]
+        if comps.empty:
             return 0.0, 0, []
-        prices_sorted = sorted(prices)
-        items_sorted = sorted(items_with_prices, key=lambda x: x[0])
-        top_5_urls = [url for _, url in items_sorted[:5]]
-        bottom_5 = prices_sorted[:5]
-        mid = len(bottom_5) // 2
-        equilibrium = bottom_5[mid] if len(bottom_5) % 2 != 0 else (bottom_5[mid - 1] + bottom_5[mid]) / 2
-        return round(equilibrium, 2), len(prices), top_5_urls
+        bottom_5 = comps.sort_values("price", kind="stable").head(5)
+        top_5_urls = bottom_5["itemWebUrl"].fillna("").tolist()
+        equilibrium = float(bottom_5["price"].median())
+        return round(equilibrium, 2), len(comps), top_5_urls
     except Exception:
         return 0.0, 0, []
 
+LotLookupRow = namedtuple("LotLookupRow", [
+    "title", "category", "listing_count", "equilibrium_price", "acquisition_cost",
+    "ebay_link_1", "ebay_link_2", "ebay_link_3", "ebay_link_4", "ebay_link_5"
+])
+
+SAMPLE_LOT_CSV = (
+    "title,category\n"
+    "Die Hard,DVD & Blu-ray\n"
+    "Halo 3,Video Games & Consoles\n"
+    "Nirvana Nevermind,Music CDs"
+)
+SAMPLE_LOT_CSV_BYTES = SAMPLE_LOT_CSV.encode("utf-8")
+
+LOT_RESULT_COLUMNS = [
+    "title", "category", "max_acquisition", "listing_count", "equilibrium_price", "total_fees",
+    "total_payout", "acquisition_cost", "net_profit", "margin_pct", "decision",
+    "ebay_link_1", "ebay_link_2", "ebay_link_3", "ebay_link_4", "ebay_link_5"
+]
+
 def run_lot_analysis(titles_df, bulk_max_price, bulk_limit, margin_target, access_token, category_options, condition_ids="3000"):
-    bulk_results = []
+    lookups = []
     progress_bar = st.progress(0)
     status_text = st.empty()
-    for i, row in titles_df.iterrows():
-        title = str(row["title"]).strip()
-        acquisition_cost = float(row["acquisition_cost"])
-        row_category = str(row.get("category", "All Categories")).strip() if "category" in titles_df.columns else "All Categories"
+    # Coerce whole columns once instead of boxing and converting every row
+    titles = titles_df["title"].astype(str).str.strip()
+    if "category" in titles_df.columns:
+        categories = titles_df["category"].astype(str).str.strip()
+    else:
+        categories = pd.Series("All Categories", index=titles_df.index)
+    acquisition_costs = titles_df["acquisition_cost"].astype(float)
+    for i, (title, row_category, acquisition_cost) in enumerate(zip(titles, categories, acquisition_costs)):
         category_id = category_options.get(row_category, None)
         status_text.text(f"Searching {i+1}/{len(titles_df)}: {title}")
         progress_bar.progress((i + 1) / len(titles_df))
         equilibrium_price, listing_count, top_5_urls = get_equilibrium_price(
             title, category_id, bulk_max_price, bulk_limit, access_token, condition_ids
         )
-        max_acq = calculate_max_acquisition(equilibrium_price, margin_target, row_category) if equilibrium_price > 0 else 0.0
-        profit_data = calculate_profit(equilibrium_price, acquisition_cost, margin_target, row_category) if equilibrium_price > 0 else {
-            "net_profit": 0.0, "margin_pct": 0.0, "total_fees": 0.0, "meets_target": False, "total_payout": 0.0
-        }
-        bulk_results.append({
-            "title": title,
-            "category": row_category,
-            "max_acquisition": max_acq,
-            "listing_count": listing_count,
-            "equilibrium_price": equilibrium_price,
-            "total_fees": profit_data["total_fees"],
-            "total_payout": profit_data["total_payout"],
-            "acquisition_cost": acquisition_cost,
-            "net_profit": profit_data["net_profit"],
-            "margin_pct": profit_data["margin_pct"],
-            "decision": "✅ WINNER" if profit_data["meets_target"] and profit_data["net_profit"] >= 10 else "❌ DUD",
-            "ebay_link_1": top_5_urls[0] if len(top_5_urls) > 0 else "",
-            "ebay_link_2": top_5_urls[1] if len(top_5_urls) > 1 else "",
-            "ebay_link_3": top_5_urls[2] if len(top_5_urls) > 2 else "",
-            "ebay_link_4": top_5_urls[3] if len(top_5_urls) > 3 else "",
-            "ebay_link_5": top_5_urls[4] if len(top_5_urls) > 4 else ""
-        })
+        lookups.append(LotLookupRow(
+            title, row_category, listing_count, equilibrium_price, acquisition_cost,
+            *(list(top_5_urls) + [""] * 5)[:5]
+        ))
     progress_bar.empty()
     status_text.empty()
-    return pd.DataFrame(bulk_results).sort_values("net_profit", ascending=False).reset_index(drop=True)
+
+    # Fee/profit math runs once over all titles; titles without comps stay at zero
+    results = pd.DataFrame(lookups, columns=LotLookupRow._fields)
+    priced = (results["equilibrium_price"] > 0).to_numpy()
+    profit_cols = calculate_profit_columns(results["equilibrium_price"], results["acquisition_cost"], margin_target, results["category"])
+    money_cols = ["net_profit", "margin_pct", "total_fees", "total_payout", "max_acquisition"]
+    profit_cols.loc[~priced, money_cols] = 0.0
+    profit_cols.loc[~priced, "meets_target"] = False
+    results[money_cols] = profit_cols[money_cols]
+    results["decision"] = np.where(profit_cols["meets_target"] & (profit_cols["net_profit"] >= 10), "✅ WINNER", "❌ DUD")
+    return results[LOT_RESULT_COLUMNS].sort_values("net_profit", ascending=False).reset_index(drop=True)
 
 def display_lot_results(results_df, margin_target, is_lot=True):
     def color_decision(val):
@@ -328,14 +609,14 @@ def display_lot_results(results_df, margin_target, is_lot=True):
         "net_profit": "${:.2f}",
         "margin_pct": "{:.1f}%"
     }).map(color_decision, subset=["decision"])
-    st.dataframe(styled, use_container_width=True, column_config={
+    st.dataframe(styled, width="stretch", column_config={
         "ebay_link_1": st.column_config.LinkColumn("eBay #1", display_text="Link 1"),
         "ebay_link_2": st.column_config.LinkColumn("eBay #2", display_text="Link 2"),
         "ebay_link_3": st.column_config.LinkColumn("eBay #3", display_text="Link 3"),
         "ebay_link_4": st.column_config.LinkColumn("eBay #4", display_text="Link 4"),
         "ebay_link_5": st.column_config.LinkColumn("eBay #5", display_text="Link 5"),
     })
-    csv_out = results_df.to_csv(index=False)
+    csv_out = to_csv_bytes(results_df)
     st.download_button(
         "📥 Download Analysis CSV",
         csv_out,
@@ -354,23 +635,32 @@ with st.sidebar:
     st.header("💾 Saved Searches")
     if st.session_state.saved_searches:
         st.write(f"You have {len(st.session_state.saved_searches)} saved searches")
-        for i, search in enumerate(st.session_state.saved_searches):
-            with st.expander(f"🔍 {search['name'][:30]}..."):
-                st.write(f"**Saved:** {search['saved_at']}")
-                st.write(f"**Search:** {search['params']['search_term']}")
-                st.write(f"**Category:** {search['params']['category']}")
-                st.write(f"**Max Price:** ${search['params']['max_price']}")
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("Load", key=f"load_{i}"):
-                        load_saved_search(search['params'])
-                        st.success("Search loaded!")
-                        st.rerun()
-                with col2:
-                    if st.button("Delete", key=f"del_{i}"):
-                        delete_saved_search(i)
-                        st.success("Search deleted!")
-                        st.rerun()
+        # Built straight from the saved records; only the displayed fields are pulled out
+        saved_df = pd.DataFrame(st.session_state.saved_searches, columns=["name", "saved_at"])
+        saved_df.insert(0, "load", False)
+        saved_df.insert(1, "delete", False)
+        # One editor for all saved searches; a fresh key after each action clears the ticked boxes
+        edited = st.data_editor(
+            saved_df,
+            column_config={
+                "load": st.column_config.CheckboxColumn("Load"),
+                "delete": st.column_config.CheckboxColumn("Delete"),
+                "name": st.column_config.TextColumn("Search"),
+                "saved_at": st.column_config.TextColumn("Saved")
+            },
+            disabled=["name", "saved_at"],
+            hide_index=True,
+            key=f"saved_search_editor_{st.session_state.saved_search_editor_version}"
+        )
+        load_rows = edited.index[edited["load"]].tolist()
+        delete_rows = edited.index[edited["delete"]].tolist()
+        if load_rows or delete_rows:
+            if load_rows:
+                load_saved_search(st.session_state.saved_searches[load_rows[0]]['params'])
+            for i in sorted(delete_rows, reverse=True):
+                delete_saved_search(i)
+            st.session_state.saved_search_editor_version += 1
+            st.rerun()
     else:
         st.info("No saved searches yet. Run a search and save it!")
 
@@ -386,32 +676,33 @@ tab1, tab2 = st.tabs(["🔍 Search Listings", "📦 Lot Analysis"])
 
 with tab1:
     st.write("Fetch latest eBay listings by category, type, and max price.")
+    loaded = st.session_state.get('loaded', {})
 
     selected_category = st.selectbox(
         "Category",
-        options=list(category_options.keys()),
-        index=list(category_options.keys()).index(st.session_state.get('loaded_category', 'All Categories'))
+        options=CATEGORY_NAMES,
+        index=CATEGORY_INDEX.get(loaded.get('category'), 0)
     )
     listing_type_filter = st.selectbox(
         "Filter by listing type",
-        ["All", "Auction", "Fixed Price", "Best Offer"],
-        index=["All", "Auction", "Fixed Price", "Best Offer"].index(st.session_state.get('loaded_listing_type', 'All'))
+        LISTING_TYPE_OPTIONS,
+        index=LISTING_TYPE_OPTIONS.index(loaded.get('listing_type', 'All'))
     )
     seller_type_filter = st.selectbox(
         "Seller Type",
-        ["All", "Charity"],
-        index=["All", "Charity"].index(st.session_state.get('loaded_seller_type', 'All')),
+        SELLER_TYPE_OPTIONS,
+        index=SELLER_TYPE_OPTIONS.index(loaded.get('seller_type', 'All')),
         help="Charity includes Goodwill, Salvation Army, Habitat for Humanity, St. Vincent de Paul, Catholic Charities, and other nonprofit thrift stores"
     )
     seller_rating_filter = st.multiselect(
         "Filter by seller rating (select multiple or leave empty for all)",
         ["Elite", "Excellent", "Very Good", "Good", "Inexperienced"],
         help="Elite: ≥5000/99% | Excellent: ≥1000/98% | Very Good: ≥500/97% | Good: ≥100/95% | Average: ≥100/90% | Inexperienced: <100/≥90%",
-        default=st.session_state.get('loaded_seller_rating', [])
+        default=loaded.get('seller_rating', [])
     )
-    search_term = st.text_input("Search for:", value=st.session_state.get('loaded_search_term', ''))
-    max_price = st.number_input("Maximum total price ($):", min_value=1, max_value=10000, value=st.session_state.get('loaded_max_price', 150))
-    limit = st.slider("Number of listings to fetch:", min_value=1, max_value=100, value=st.session_state.get('loaded_limit', 100))
+    search_term = st.text_input("Search for:", value=loaded.get('search_term', ''))
+    max_price = st.number_input("Maximum total price ($):", min_value=1, max_value=10000, value=loaded.get('max_price', 150))
+    limit = st.slider("Number of listings to fetch:", min_value=1, max_value=MAX_SEARCH_LIMIT, value=loaded.get('limit', 100))
 
     col1, col2 = st.columns([3, 1])
     with col1:
@@ -432,143 +723,24 @@ with tab1:
                 st.warning("Search already exists!")
 
     if search_clicked:
-        for key in list(st.session_state.keys()):
-            if key.startswith('loaded_'):
-                del st.session_state[key]
+        st.session_state.pop('loaded', None)
 
         if not access_token:
             st.error("Unable to search - missing access token")
         else:
-            if selected_category in ["Cell Phones & Smartphones", "Tablets & eBook Readers"]:
-                query = f'"{search_term}" -(case,cover,keyboard,manual,guide,screen,protector,folio,box,accessory,cable,cord,charger,pen,for parts,not working, empty box)'
-            elif selected_category == "Tech Accessories":
-                query = f'"{search_term}" -(broken,defective,not working,for parts, empty box)'
-            else:
-                query = search_term
-
-            filters = [
-                f"price:[1..{max_price}]",
-                "priceCurrency:USD",
-                "conditions:{1000|1500|2000|2500|3000}"
-            ]
-            if listing_type_filter == "Auction":
-                filters.append("buyingOptions:{AUCTION}")
-            elif listing_type_filter == "Fixed Price":
-                filters.append("buyingOptions:{FIXED_PRICE}")
-            elif listing_type_filter == "Best Offer":
-                filters.append("buyingOptions:{BEST_OFFER}")
-
-            if selected_category in aspect_map:
-                aspect_name, aspect_value = aspect_map[selected_category]
-                filters.append(f"aspect_filter={aspect_name}:{{{aspect_value}}}")
-                if selected_category == "Men's Clothing":
-                    query += ' "Medium"'
-                elif selected_category == "Men's Shoes":
-                    query += ' "11"'
-
-            params = {"q": query, "filter": ",".join(filters), "limit": limit}
-            category_ids = category_options[selected_category]
-            if category_ids:
-                params["category_ids"] = category_ids
-
-            headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-
             with st.spinner("Searching eBay..."):
-                response = requests.get(
-                    "https://api.ebay.com/buy/browse/v1/item_summary/search",
-                    params=params, headers=headers
-                )
-
-                if response.status_code != 200:
-                    st.error(f"API Error: {response.status_code} - {response.text}")
-                else:
-                    items = response.json().get("itemSummaries", [])
-                    results = []
-                    for item in items:
-                        price = float(item.get("price", {}).get("value", 0.0))
-                        shipping = float(item.get("shippingOptions", [{}])[0].get("shippingCost", {}).get("value", 0.0))
-                        total_cost = price + shipping
-                        buying_options = item.get("buyingOptions", [])
-                        if item.get("conditionId") == "7000":
-                            continue
-                        seller_info = item.get("seller", {})
-                        seller_username = seller_info.get("username", "")
-                        seller_feedback_score = seller_info.get("feedbackScore", 0)
-                        seller_feedback_percent = seller_info.get("feedbackPercentage", 0)
-                        if seller_type_filter == "Charity" and not is_charity_seller(seller_username):
-                            continue
-                        seller_category = categorize_seller(seller_feedback_score, seller_feedback_percent)
-                        if seller_rating_filter and seller_category not in seller_rating_filter:
-                            continue
-                        end_time = "N/A"
-                        end_time_str = item.get("itemEndDate")
-                        if "AUCTION" in buying_options and end_time_str:
-                            try:
-                                utc_dt = datetime.datetime.fromisoformat(end_time_str.replace("Z", "+00:00"))
-                                local_dt = utc_dt.astimezone(pytz.timezone('US/Central'))
-                                end_time = local_dt.strftime("%Y-%m-%d %I:%M %p %Z")
-                            except Exception:
-                                end_time = "Invalid date"
-                        current_bid_price = float(item.get("currentBidPrice", {}).get("value", 0.0)) if "AUCTION" in buying_options else None
-                        if total_cost <= max_price:
-                            results.append({
-                                "listing": item.get("title", ""),
-                                "condition": item.get("condition"),
-                                "price": price,
-                                "current_bid_price": current_bid_price,
-                                "listing_type": ", ".join(buying_options),
-                                "bid_count": item.get("bidCount") if "AUCTION" in buying_options else None,
-                                "auction_end_time": end_time,
-                                "seller": seller_username,
-                                "seller_rating": seller_category,
-                                "seller_feedback": seller_feedback_percent,
-                                "seller_feedback_score": seller_feedback_score,
-                                "link": item.get("itemWebUrl")
-                            })
-
-                    if results and listing_type_filter != "Auction":
-                        df = pd.DataFrame(results).sort_values(by="price").reset_index(drop=True)
-                        df = df.drop(columns=['current_bid_price', 'bid_count', 'auction_end_time'], errors='ignore')
-                        st.header("📊 Price Analytics")
-                        create_price_analytics(df)
-                        st.header("📋 Search Results")
-                        if seller_type_filter == "Charity":
-                            st.info(f"🏪 Showing {len(df)} listings from charity stores")
-                        df_display = df.copy()
-                        df_display['price'] = df_display['price'].apply(lambda v: f"${v:,.2f}")
-                        st.dataframe(
-                            df_display.style.set_properties(**{"text-align": "center", "white-space": "pre-wrap"})
-                                .set_table_styles([{"selector": "th", "props": [("font-weight", "bold"), ("text-align", "center")]}]),
-                            column_config={"link": st.column_config.LinkColumn("Link", display_text="View Listing")},
-                            use_container_width=True
-                        )
-                        st.download_button("📥 Download Results as CSV", df.to_csv(index=False),
-                            f"ebay_search_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.csv", "text/csv")
-                        st.success(f"Found {len(results)} listings" + (" from charity stores" if seller_type_filter == "Charity" else ""))
-
-                    elif results and listing_type_filter == "Auction":
-                        st.header("📋 Auction Listings")
-                        df = pd.DataFrame(results).drop(columns=['price'], errors='ignore')
-                        df = df.sort_values(by="auction_end_time", ascending=True, na_position="last").reset_index(drop=True)
-                        if seller_type_filter == "Charity":
-                            st.info(f"🏪 Showing {len(df)} auction listings from charity stores")
-                        df_display = df.copy()
-                        if 'current_bid_price' in df_display.columns:
-                            df_display['current_bid_price'] = df_display['current_bid_price'].apply(
-                                lambda v: f"${v:,.2f}" if v is not None else "N/A"
-                            )
-                        st.dataframe(
-                            df_display.style.set_properties(**{"text-align": "center", "white-space": "pre-wrap"})
-                                .set_table_styles([{"selector": "th", "props": [("font-weight", "bold"), ("text-align", "center")]}]),
-                            column_config={"link": st.column_config.LinkColumn("Link", display_text="View Listing")},
-                            use_container_width=True
-                        )
-                        st.download_button("📥 Download Results as CSV", df.to_csv(index=False),
-                            f"ebay_search_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.csv", "text/csv")
-                        st.success(f"Found {len(results)} auction listings" + (" from charity stores" if seller_type_filter == "Charity" else ""))
+                try:
+                    results = run_search(
+                        search_term, selected_category, listing_type_filter, seller_type_filter,
+                        seller_rating_filter, max_price, limit, access_token
+                    )
+                except requests.RequestException as e:
+                    if e.response is not None:
+                        st.error(f"API Error: {e.response.status_code} - {e.response.text}")
                     else:
-                        st.info("No listings found from charity stores matching your criteria." if seller_type_filter == "Charity"
-                                else "No listings found matching your criteria.")
+                        st.error(f"API Error: {e}")
+                else:
+                    render_search_results(results, listing_type_filter, seller_type_filter)
 
 # ============================================================
 # TAB 2 — Lot Analysis
@@ -588,15 +760,9 @@ with tab2:
             help="BUY requires margin >= this. Default: 30%"
         )
     with col_d:
-        CONDITION_MAP = {
-            "Used only": "3000",
-            "New only": "1000",
-            "New + Used": "1000|1500|3000",
-            "All conditions": "1000|1500|2000|2500|3000"
-        }
         condition_label = st.selectbox(
             "Condition filter",
-            options=list(CONDITION_MAP.keys()),
+            options=CONDITION_LABELS,
             index=0,
             key="bulk_condition",
             help="'Used only' recommended for thrift/lot sourcing to avoid new price skew"
@@ -607,7 +773,7 @@ with tab2:
 
     if input_mode == "Single Title":
         single_title = st.text_input("Title", placeholder="e.g. Halo 3 Xbox 360", key="single_title_input")
-        single_category = st.selectbox("Category", options=list(category_options.keys()), key="single_cat")
+        single_category = st.selectbox("Category", options=CATEGORY_NAMES, key="single_cat")
         single_cost = st.number_input("Your acquisition cost ($)", min_value=0.0, value=1.00, step=0.25, key="single_cost")
 
         if st.button("🔍 Look Up & Analyze", type="primary", key="single_search_btn"):
@@ -627,15 +793,8 @@ with tab2:
     else:
         with st.expander("ℹ️ Expected CSV format"):
             st.write(" Only `title` and `category` needed — acquisition cost is calculated automatically.")
-            st.code(
-                "title,category\n"
-                "Die Hard,DVD & Blu-ray\n"
-                "Halo 3,Video Games & Consoles\n"
-                "Nirvana Nevermind,Music CDs",
-                language="csv"
-            )
-            sample = "title,category\nDie Hard,DVD & Blu-ray\nHalo 3,Video Games & Consoles\nNirvana Nevermind,Music CDs"
-            st.download_button("📥 Download Sample CSV", sample, "sample_lot.csv", "text/csv")
+            st.code(SAMPLE_LOT_CSV, language="csv")
+            st.download_button("📥 Download Sample CSV", SAMPLE_LOT_CSV_BYTES, "sample_lot.csv", "text/csv")
 
         uploaded_csv = st.file_uploader("Upload title CSV", type=["csv"], key="bulk_upload")
 
@@ -646,7 +805,7 @@ with tab2:
                     st.error("CSV must have a 'title' column.")
                 else:
                     st.write(f"Found **{len(titles_df)} titles** ready to analyze.")
-                    st.dataframe(titles_df, use_container_width=True)
+                    st.dataframe(titles_df, width="stretch")
 
                     acquisition_mode = st.radio(
                         "Acquisition cost mode",
@@ -681,12 +840,12 @@ with tab2:
                                 total_max_bid = results["max_acquisition"].sum()
                                 per_title_cogs = total_max_bid / len(results)
                                 results["acquisition_cost"] = per_title_cogs
-                                results[["net_profit", "margin_pct", "total_fees", "total_payout", "meets_target"]] = results.apply(
-                                    lambda r: pd.Series(calculate_profit(r["equilibrium_price"], per_title_cogs, margin_target, r["category"])),
-                                    axis=1
-                                )
-                                results["decision"] = results.apply(
-                                    lambda r: "✅ WINNER" if r["meets_target"] and r["net_profit"] >= 10 else "❌ DUD", axis=1
+                                profit_cols = calculate_profit_columns(results["equilibrium_price"], per_title_cogs, margin_target, results["category"])
+                                # max_acquisition keeps its run_lot_analysis value (zero for titles without comps)
+                                rescored_cols = ["net_profit", "margin_pct", "total_fees", "total_payout", "meets_target"]
+                                results[rescored_cols] = profit_cols[rescored_cols]
+                                results["decision"] = np.where(
+                                    results["meets_target"] & (results["net_profit"] >= 10), "✅ WINNER", "❌ DUD"
                                 )
                                 st.caption(f"📌 Derived max bid: **${total_max_bid:.2f}** — per-title COGS: **${per_title_cogs:.2f}** ({len(results)} titles)")
 